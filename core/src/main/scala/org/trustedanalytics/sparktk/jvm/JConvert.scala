@@ -27,6 +27,12 @@ object JConvert extends Serializable {
     }
   }
 
+  /**
+   * Option holding a Long.  py4j sends small Python ints as java.lang.Integer, so toOption would wrap an Integer in
+   * what the JVM treats as an Option[Long]; taking a Long parameter makes py4j widen the value on the way in.
+   */
+  def toOptionLong(item: Long): Option[Long] = Some(item)
+
   def toEitherStringInt(item: Any): Either[String, Int] = {
     item match {
       case s: String => Left(s)
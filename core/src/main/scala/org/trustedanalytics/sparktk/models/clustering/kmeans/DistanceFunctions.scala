@@ -0,0 +1,347 @@
+package org.trustedanalytics.sparktk.models.clustering.kmeans
+
+/**
+ * Distance kernels used when scoring observations against KMeans centroids
+ */
+object DistanceFunctions {
+
+  /**
+   * Number of points scored together by closestCentroids
+   */
+  val PointBlockSize = 64
+
+  /**
+   * Number of dimensions summed between checks against the bound in boundedSquaredDistance
+   */
+  private val BoundCheckInterval = 16
+
+  /**
+   * When a distance computed from norms and a dot product comes out smaller than this fraction of the squared norms,
+   * too many digits were lost to cancellation and it is recomputed directly.  Same threshold as Mahout's
+   * getDistanceSquared, which keeps the relative error of the distances it does not recompute around 1e-13
+   */
+  private val NormExpansionPrecision = 1e-3
+
+  /**
+   * Squared Euclidean distance between two points of the same length
+   *
+   * Works on plain double arrays with four independent accumulators, so the JIT can keep the loop free of virtual
+   * calls and vectorize the differences and squares
+   * @param a first point
+   * @param b second point
+   * @return sum of the squared differences
+   */
+  def squaredDistance(a: Array[Double], b: Array[Double]): Double = squaredDistance(a, b, 0, a.length)
+
+  /**
+   * Squared Euclidean distance which gives up once the running sum reaches the given bound.  The sum is checked
+   * every BoundCheckInterval dimensions, so a point which cannot beat the best centroid found so far usually costs
+   * only a prefix of the full loop.
+   * @param a first point
+   * @param b second point
+   * @param bound distance at or above which the exact value is no longer of interest
+   * @return the squared distance if it is below bound, otherwise some partial sum which is at least bound
+   */
+  def boundedSquaredDistance(a: Array[Double], b: Array[Double], bound: Double): Double = {
+    val length = a.length
+    var sum = 0.0
+    var from = 0
+    while (from < length) {
+      val until = math.min(from + BoundCheckInterval, length)
+      sum += squaredDistance(a, b, from, until)
+      if (sum >= bound) {
+        return sum
+      }
+      from = until
+    }
+    sum
+  }
+
+  /**
+   * Dot product of two points of the same length, with the same four accumulator unrolling as squaredDistance
+   */
+  def dot(a: Array[Double], b: Array[Double]): Double = {
+    val length = a.length
+    val unrolledLength = length - length % 4
+    var s0 = 0.0
+    var s1 = 0.0
+    var s2 = 0.0
+    var s3 = 0.0
+    var d = 0
+    while (d < unrolledLength) {
+      s0 += a(d) * b(d)
+      s1 += a(d + 1) * b(d + 1)
+      s2 += a(d + 2) * b(d + 2)
+      s3 += a(d + 3) * b(d + 3)
+      d += 4
+    }
+    while (d < length) {
+      s0 += a(d) * b(d)
+      d += 1
+    }
+    (s0 + s1) + (s2 + s3)
+  }
+
+  /**
+   * Squared Euclidean norm of a point
+   */
+  def squaredNorm(a: Array[Double]): Double = dot(a, a)
+
+  /**
+   * Sum of the squared differences over the dimensions [from, until)
+   */
+  private def squaredDistance(a: Array[Double], b: Array[Double], from: Int, until: Int): Double = {
+    val unrolledUntil = until - (until - from) % 4
+    var s0 = 0.0
+    var s1 = 0.0
+    var s2 = 0.0
+    var s3 = 0.0
+    var d = from
+    while (d < unrolledUntil) {
+      val d0 = a(d) - b(d)
+      val d1 = a(d + 1) - b(d + 1)
+      val d2 = a(d + 2) - b(d + 2)
+      val d3 = a(d + 3) - b(d + 3)
+      s0 += d0 * d0
+      s1 += d1 * d1
+      s2 += d2 * d2
+      s3 += d3 * d3
+      d += 4
+    }
+    while (d < until) {
+      val diff = a(d) - b(d)
+      s0 += diff * diff
+      d += 1
+    }
+    (s0 + s1) + (s2 + s3)
+  }
+
+  /**
+   * Computes the squared Euclidean distance from a point to every centroid in a single pass over the centroids
+   *
+   * Each distance is expanded as |x|^2 + |c|^2 - 2 x.c, so with the centroid norms computed up front the work per
+   * centroid is a single dot product.  Distances which lose too much precision to cancellation are recomputed
+   * directly.
+   * @param point the observation
+   * @param centroids the cluster centers, each the same length as point
+   * @param centroidSquaredNorms squared norm of each centroid (see squaredNorm)
+   * @return array holding the squared distance to each centroid, in centroid order
+   */
+  def squaredDistances(point: Array[Double], centroids: Array[Array[Double]], centroidSquaredNorms: Array[Double]): Array[Double] = {
+    val pointSquaredNorm = squaredNorm(point)
+    val distances = new Array[Double](centroids.length)
+    var i = 0
+    while (i < centroids.length) {
+      val sumSquaredNorms = pointSquaredNorm + centroidSquaredNorms(i)
+      val distance = sumSquaredNorms - 2.0 * dot(point, centroids(i))
+      distances(i) = if (distance > NormExpansionPrecision * sumSquaredNorms) distance else squaredDistance(point, centroids(i))
+      i += 1
+    }
+    distances
+  }
+
+  /**
+   * Finds the centroid nearest to a point.
+   *
+   * (|x| - |c|)^2 is a lower bound on the squared distance, so centroids whose norm alone rules them out are skipped
+   * without touching their coordinates, and distances to the rest are cut short as soon as they reach the best
+   * distance found so far.
+   * @param point the observation
+   * @param centroids the cluster centers, each the same length as point
+   * @param centroidSquaredNorms squared norm of each centroid (see squaredNorm)
+   * @return index of the nearest centroid (the first one, on ties) and the squared distance to it
+   */
+  def closestCentroid(point: Array[Double], centroids: Array[Array[Double]], centroidSquaredNorms: Array[Double]): (Int, Double) = {
+    val pointNorm = math.sqrt(squaredNorm(point))
+    var bestIndex = 0
+    var bestDistance = Double.PositiveInfinity
+    var i = 0
+    while (i < centroids.length) {
+      val normDifference = pointNorm - math.sqrt(centroidSquaredNorms(i))
+      if (normDifference * normDifference < bestDistance) {
+        val distance = boundedSquaredDistance(point, centroids(i), bestDistance)
+        if (distance < bestDistance) {
+          bestDistance = distance
+          bestIndex = i
+        }
+      }
+      i += 1
+    }
+    (bestIndex, bestDistance)
+  }
+
+  /**
+   * Computes the squared distance from a point to every centroid and finds the nearest one, in a single pass over the
+   * centroids.  The distances are summed directly, in the same order as closestCentroid sums them, so the nearest
+   * centroid is the one closestCentroid finds (short of distances within rounding of each other, which closestCentroid
+   * may skip by their norms).
+   * @param point the observation
+   * @param centroids the cluster centers, each the same length as point
+   * @return index of the nearest centroid (the first one, on ties) and the squared distance to each centroid
+   */
+  def closestCentroidWithDistances(point: Array[Double], centroids: Array[Array[Double]]): (Int, Array[Double]) = {
+    val distances = new Array[Double](centroids.length)
+    var bestIndex = 0
+    var i = 0
+    while (i < centroids.length) {
+      distances(i) = boundedSquaredDistance(point, centroids(i), Double.PositiveInfinity)
+      if (distances(i) < distances(bestIndex)) {
+        bestIndex = i
+      }
+      i += 1
+    }
+    (bestIndex, distances)
+  }
+
+  /**
+   * Finds the nearest centroid for each point in a block of points.
+   *
+   * Loops over the centroids on the outside and the points on the inside, so each centroid is read once per block and
+   * stays in cache while every point is compared against it.  Each point gets the same result as from closestCentroid.
+   * @param points block of observations (see PointBlockSize)
+   * @param centroids the cluster centers, each the same length as the points
+   * @param centroidSquaredNorms squared norm of each centroid (see squaredNorm)
+   * @return for each point, the index of the nearest centroid and the squared distance to it
+   */
+  def closestCentroids(points: Array[Array[Double]],
+                       centroids: Array[Array[Double]],
+                       centroidSquaredNorms: Array[Double]): (Array[Int], Array[Double]) = {
+    val pointNorms = points.map(point => math.sqrt(squaredNorm(point)))
+    val bestIndexes = new Array[Int](points.length)
+    val bestDistances = Array.fill(points.length)(Double.PositiveInfinity)
+    var i = 0
+    while (i < centroids.length) {
+      val centroid = centroids(i)
+      val centroidNorm = math.sqrt(centroidSquaredNorms(i))
+      var p = 0
+      while (p < points.length) {
+        val normDifference = pointNorms(p) - centroidNorm
+        if (normDifference * normDifference < bestDistances(p)) {
+          val distance = boundedSquaredDistance(points(p), centroid, bestDistances(p))
+          if (distance < bestDistances(p)) {
+            bestDistances(p) = distance
+            bestIndexes(p) = i
+          }
+        }
+        p += 1
+      }
+      i += 1
+    }
+    (bestIndexes, bestDistances)
+  }
+
+  /**
+   * Single precision squared Euclidean distance, unrolled the same way as the double precision version.  Twice as
+   * many floats as doubles fit in each vector register and cache line.
+   * @param a first point
+   * @param b second point
+   * @return sum of the squared differences
+   */
+  def squaredDistance(a: Array[Float], b: Array[Float]): Float = squaredDistance(a, b, 0, a.length)
+
+  /**
+   * Single precision version of boundedSquaredDistance
+   * @param a first point
+   * @param b second point
+   * @param bound distance at or above which the exact value is no longer of interest
+   * @return the squared distance if it is below bound, otherwise some partial sum which is at least bound
+   */
+  def boundedSquaredDistance(a: Array[Float], b: Array[Float], bound: Float): Float = {
+    val length = a.length
+    var sum = 0.0f
+    var from = 0
+    while (from < length) {
+      val until = math.min(from + BoundCheckInterval, length)
+      sum += squaredDistance(a, b, from, until)
+      if (sum >= bound) {
+        return sum
+      }
+      from = until
+    }
+    sum
+  }
+
+  /**
+   * Squared Euclidean norm of a single precision point
+   */
+  def squaredNorm(a: Array[Float]): Float = {
+    var sum = 0.0f
+    var d = 0
+    while (d < a.length) {
+      sum += a(d) * a(d)
+      d += 1
+    }
+    sum
+  }
+
+  /**
+   * Copies a point into a single precision buffer of the same length
+   * @param values the point
+   * @param buffer array to write the single precision values into
+   * @return buffer
+   */
+  def toFloats(values: Array[Double], buffer: Array[Float]): Array[Float] = {
+    var d = 0
+    while (d < values.length) {
+      buffer(d) = values(d).toFloat
+      d += 1
+    }
+    buffer
+  }
+
+  /**
+   * Sum of the single precision squared differences over the dimensions [from, until)
+   */
+  private def squaredDistance(a: Array[Float], b: Array[Float], from: Int, until: Int): Float = {
+    val unrolledUntil = until - (until - from) % 4
+    var s0 = 0.0f
+    var s1 = 0.0f
+    var s2 = 0.0f
+    var s3 = 0.0f
+    var d = from
+    while (d < unrolledUntil) {
+      val d0 = a(d) - b(d)
+      val d1 = a(d + 1) - b(d + 1)
+      val d2 = a(d + 2) - b(d + 2)
+      val d3 = a(d + 3) - b(d + 3)
+      s0 += d0 * d0
+      s1 += d1 * d1
+      s2 += d2 * d2
+      s3 += d3 * d3
+      d += 4
+    }
+    while (d < until) {
+      val diff = a(d) - b(d)
+      s0 += diff * diff
+      d += 1
+    }
+    (s0 + s1) + (s2 + s3)
+  }
+
+  /**
+   * Finds the centroid nearest to a point, in single precision, skipping and cutting short centroids the same way as
+   * the double precision closestCentroid
+   * @param point the observation
+   * @param centroids the cluster centers, each the same length as point
+   * @param centroidSquaredNorms squared norm of each centroid (see squaredNorm)
+   * @return index of the nearest centroid (the first one, on ties) and the squared distance to it
+   */
+  def closestCentroid(point: Array[Float], centroids: Array[Array[Float]], centroidSquaredNorms: Array[Float]): (Int, Float) = {
+    val pointNorm = math.sqrt(squaredNorm(point)).toFloat
+    var bestIndex = 0
+    var bestDistance = Float.PositiveInfinity
+    var i = 0
+    while (i < centroids.length) {
+      val normDifference = pointNorm - math.sqrt(centroidSquaredNorms(i)).toFloat
+      if (normDifference * normDifference < bestDistance) {
+        val distance = boundedSquaredDistance(point, centroids(i), bestDistance)
+        if (distance < bestDistance) {
+          bestDistance = distance
+          bestIndex = i
+        }
+      }
+      i += 1
+    }
+    (bestIndex, bestDistance)
+  }
+}
@@ -1,16 +1,21 @@
 package org.trustedanalytics.sparktk.models.clustering.kmeans
 
+import java.nio.{ ByteBuffer, ByteOrder }
+
 import org.apache.spark.SparkContext
+import org.apache.spark.broadcast.Broadcast
 import org.apache.spark.mllib.clustering.{ KMeans => SparkKMeans, KMeansModel => SparkKMeansModel }
 import org.apache.spark.mllib.linalg.{ Vector => MllibVector }
 import org.apache.spark.sql.Row
 import org.trustedanalytics.sparktk.frame.internal.RowWrapper
-import org.trustedanalytics.sparktk.frame.internal.rdd.{ VectorUtils, FrameRdd, RowWrapperFunctions }
+import org.trustedanalytics.sparktk.frame.internal.rdd.{ FrameRdd, RowWrapperFunctions }
 import org.trustedanalytics.sparktk.frame._
 import org.trustedanalytics.sparktk.saveload.{ SaveLoad, TkSaveLoad, TkSaveableObject }
 
 import scala.language.implicitConversions
+import org.json4s.DefaultFormats
 import org.json4s.JsonAST.JValue
+import org.json4s.jackson.Serialization
 
 object KMeansModel extends TkSaveableObject {
 
@@ -128,28 +133,93 @@ case class KMeansModel private[kmeans] (columns: Seq[String],
 
   def centroids: Array[MllibVector] = sparkModel.clusterCenters
 
+  /**
+   * Column names as a JSON array, so Python gets them in one py4j call
+   */
+  def columnsAsJson: String = {
+    implicit val formats = DefaultFormats
+    Serialization.write(columns)
+  }
+
+  /**
+   * Scalings as a JSON array, or JSON null when the model has no scalings
+   */
+  def scalingsAsJson: String = {
+    implicit val formats = DefaultFormats
+    scalings.map(s => Serialization.write(s)).getOrElse("null")
+  }
+
   def centroidsAsArrays: Array[Array[Double]] = sparkModel.clusterCenters.map(_.toArray) // Make centroids easy for Python
 
+  /**
+   * Squared norm of each centroid, computed once and shared by every scoring pass
+   */
+  private[kmeans] lazy val centroidSquaredNorms: Array[Double] = centroidsAsArrays.map(DistanceFunctions.squaredNorm)
+
+  @transient private var centroidsBroadcastCache: Broadcast[KMeansCentroids] = null
+  @transient private var centroidsBroadcastContext: SparkContext = null
+
+  /**
+   * The centroids and their squared norms broadcast to the executors.  The broadcast is created once per SparkContext
+   * and shared by every scoring method and precision.
+   * @param sc SparkContext of the frame being scored
+   */
+  private[kmeans] def centroidsBroadcast(sc: SparkContext): Broadcast[KMeansCentroids] = synchronized {
+    if (centroidsBroadcastCache == null || (centroidsBroadcastContext ne sc)) {
+      centroidsBroadcastCache = sc.broadcast(KMeansCentroids(centroidsAsArrays, centroidSquaredNorms))
+      centroidsBroadcastContext = sc
+    }
+    centroidsBroadcastCache
+  }
+
+  /**
+   * Centroids packed row-major as little-endian doubles, so Python can pull them across py4j in a single transfer
+   * @return bytes for a (number of centroids) x (number of columns) array of doubles
+   */
+  def centroidsAsBytes: Array[Byte] = {
+    val centers = centroidsAsArrays
+    val dimensions = if (centers.isEmpty) 0 else centers(0).length
+    val buffer = ByteBuffer.allocate(centers.length * dimensions * 8).order(ByteOrder.LITTLE_ENDIAN)
+    centers.foreach(center => center.foreach(value => buffer.putDouble(value)))
+    buffer.array()
+  }
+
   /**
    * Computes the number of elements belonging to each cluster given the trained model and names of the frame's columns storing the observations
    * @param frame A frame containing observations
    * @param observationColumns The columns of frame storing the observations (uses column names from train by default)
-   * @return An array of length k of the cluster sizes
+   * @return An array with the size of each cluster, indexed by cluster
    */
-  def computeClusterSizes(frame: Frame, observationColumns: Option[Seq[String]] = None): Array[Int] = {
+  def computeClusterSizes(frame: Frame, observationColumns: Option[Seq[String]] = None): Array[Long] = {
     require(frame != null, "frame is required")
     require(observationColumns != null, "observationColumns cannot be null (can be None)")
     if (observationColumns.isDefined) {
       require(columns.length == observationColumns.get.length, "Number of columns for train and predict should be same")
     }
     val vectorMaker = KMeansModel.getDenseVectorMaker(observationColumns.getOrElse(columns), scalings)
+    val broadcastCentroids = centroidsBroadcast(frame.rdd.sparkContext)
+    val clusterCount = sparkModel.clusterCenters.length
     val frameRdd = new FrameRdd(frame.schema, frame.rdd)
-    val predictRDD = frameRdd.mapRows(row => {
-      val point = vectorMaker(row)
-      sparkModel.predict(point)
+    val pointRdd = frameRdd.mapRows(row => vectorMaker(row).toArray)
+
+    // count within each partition into a plain array, then add the arrays up
+    val partitionSizes = pointRdd.mapPartitions(points => {
+      val centroids = broadcastCentroids.value
+      val sizes = new Array[Long](clusterCount)
+      points.grouped(DistanceFunctions.PointBlockSize).foreach(block => {
+        val (clusters, _) = DistanceFunctions.closestCentroids(block.toArray, centroids.centers, centroids.squaredNorms)
+        clusters.foreach(cluster => sizes(cluster) += 1)
+      })
+      Iterator.single(sizes)
+    })
+    partitionSizes.fold(new Array[Long](clusterCount))((a, b) => {
+      var i = 0
+      while (i < clusterCount) {
+        a(i) += b(i)
+        i += 1
+      }
+      a
     })
-    val clusterSizes = predictRDD.map(row => (row.toString, 1)).reduceByKey(_ + _).collect().map { case (_, v) => v }
-    clusterSizes
   }
 
   /**
@@ -167,32 +237,52 @@ case class KMeansModel private[kmeans] (columns: Seq[String],
 
     val frameRdd = new FrameRdd(frame.schema, frame.rdd)
     val vectorRdd = frameRdd.toDenseVectorRdd(observationColumns.getOrElse(columns), scalings)
-    sparkModel.computeCost(vectorRdd)
+    val broadcastCentroids = centroidsBroadcast(frame.rdd.sparkContext)
+    vectorRdd.mapPartitions(points => {
+      val centroids = broadcastCentroids.value
+      var wsse = 0.0
+      points.map(_.toArray).grouped(DistanceFunctions.PointBlockSize).foreach(block => {
+        val (_, distances) = DistanceFunctions.closestCentroids(block.toArray, centroids.centers, centroids.squaredNorms)
+        wsse += distances.sum
+      })
+      Iterator.single(wsse)
+    }).sum()
   }
 
   /**
    * Computes the distances to each centroid adds each one as a new column to the given frame
    * @param frame A frame containing observations
    * @param observationColumns columns of the frame storing the observations (uses column names from train by default)
+   * @param precision Floating point precision of the distance computation, either "f64" (default) or "f32".  With
+   *                  "f32" the distances are computed against single precision copies of the centroids, so they carry
+   *                  only about 7 significant digits (the columns are still float64)
    */
-  def addDistanceColumns(frame: Frame, observationColumns: Option[Vector[String]] = None): Unit = {
+  def addDistanceColumns(frame: Frame, observationColumns: Option[Vector[String]] = None, precision: String = "f64"): Unit = {
     require(frame != null, "frame is required")
     require(observationColumns != null, "observationColumns cannot be null (can be None)")
     if (observationColumns.isDefined) {
       require(columns.length == observationColumns.get.length, "Number of columns for train and predict should be same")
     }
+    require(precision == "f64" || precision == "f32", "precision must be 'f64' or 'f32'")
 
     val vectorMaker = KMeansModel.getDenseVectorMaker(observationColumns.getOrElse(columns), scalings)
-    val distanceMapper: RowWrapper => Row = row => {
-      val point = vectorMaker(row)
-      val clusterCenters = sparkModel.clusterCenters
-      Row.fromSeq(for (i <- clusterCenters.indices) yield {
-        val distance: Double = VectorUtils.toMahoutVector(point).getDistanceSquared(VectorUtils.toMahoutVector(clusterCenters(i)))
-        distance
-      })
+    val broadcastCentroids = centroidsBroadcast(frame.rdd.sparkContext)
+    val distanceMapper: RowWrapper => Row = precision match {
+      case "f64" => row => {
+        val point = vectorMaker(row).toArray
+        val centroids = broadcastCentroids.value
+        Row.fromSeq(DistanceFunctions.squaredDistances(point, centroids.centers, centroids.squaredNorms))
+      }
+      case "f32" =>
+        // the closure is deserialized separately for each task, so each task reuses its own buffer
+        val point = new Array[Float](columns.length)
+        row => {
+          DistanceFunctions.toFloats(vectorMaker(row).toArray, point)
+          Row.fromSeq(broadcastCentroids.value.floatCenters.map(center => DistanceFunctions.squaredDistance(point, center).toDouble))
+        }
     }
 
-    val newColumns = (for (i <- sparkModel.clusterCenters.indices) yield Column("distance" + i.toString, DataTypes.float64)).toSeq
+    val newColumns = sparkModel.clusterCenters.indices.map(i => Column("distance" + i.toString, DataTypes.float64))
     frame.addColumns(distanceMapper, newColumns)
   }
 
@@ -202,23 +292,69 @@ case class KMeansModel private[kmeans] (columns: Seq[String],
    * @param observationColumns Column(s) containing the observations whose clusters are to be predicted.
    *                           Default is to predict the clusters over columns the KMeans model was trained on.
    *                           The columns are scaled using the same values used when training the model
+   * @param precision Floating point precision of the distance computation, either "f64" (default) or "f32".
+   *                  "f32" compares the observations against single precision copies of the centroids, which halves
+   *                  the centroid memory touched per row at the cost of possibly different assignments for
+   *                  observations which are nearly equidistant from two centroids
    */
-  def predict(frame: Frame, observationColumns: Option[Vector[String]] = None): Unit = {
+  def predict(frame: Frame, observationColumns: Option[Vector[String]] = None, precision: String = "f64"): Unit = {
     require(frame != null, "frame is required")
     if (observationColumns.isDefined) {
       require(columns.length == observationColumns.get.length, "Number of columns for train and predict should be same")
     }
+    require(precision == "f64" || precision == "f32", "precision must be 'f64' or 'f32'")
 
     val vectorMaker = KMeansModel.getDenseVectorMaker(observationColumns.getOrElse(columns), scalings)
-    val predictMapper: RowWrapper => Row = row => {
-      val point = vectorMaker(row)
-      val prediction = sparkModel.predict(point)
-      Row.apply(prediction)
+    val broadcastCentroids = centroidsBroadcast(frame.rdd.sparkContext)
+    val predictMapper: RowWrapper => Row = precision match {
+      case "f64" => row => {
+        val point = vectorMaker(row).toArray
+        val centroids = broadcastCentroids.value
+        Row.apply(DistanceFunctions.closestCentroid(point, centroids.centers, centroids.squaredNorms)._1)
+      }
+      case "f32" =>
+        // the closure is deserialized separately for each task, so each task reuses its own buffer
+        val point = new Array[Float](columns.length)
+        row => {
+          DistanceFunctions.toFloats(vectorMaker(row).toArray, point)
+          val centroids = broadcastCentroids.value
+          Row.apply(DistanceFunctions.closestCentroid(point, centroids.floatCenters, centroids.floatSquaredNorms)._1)
+        }
     }
 
     frame.addColumns(predictMapper, Seq(Column("cluster", DataTypes.int32)))
   }
 
+  /**
+   * Adds a column with the predicted cluster and a column with the distance to each centroid, computing both in a
+   * single pass over the centroids for each row.  The distances are computed directly, with the same arithmetic as
+   * predict, so the cluster agrees with predict even for observations nearly equidistant from two centroids.
+   * addDistanceColumns computes most distances from the centroid norms, so its columns can differ from these in
+   * their last digits.
+   * @param frame frame to add the predictions and distances to
+   * @param observationColumns Column(s) containing the observations whose clusters are to be predicted.
+   *                           Default is to predict the clusters over columns the KMeans model was trained on.
+   *                           The columns are scaled using the same values used when training the model
+   */
+  def predictWithDistances(frame: Frame, observationColumns: Option[Vector[String]] = None): Unit = {
+    require(frame != null, "frame is required")
+    require(observationColumns != null, "observationColumns cannot be null (can be None)")
+    if (observationColumns.isDefined) {
+      require(columns.length == observationColumns.get.length, "Number of columns for train and predict should be same")
+    }
+
+    val vectorMaker = KMeansModel.getDenseVectorMaker(observationColumns.getOrElse(columns), scalings)
+    val broadcastCentroids = centroidsBroadcast(frame.rdd.sparkContext)
+    val predictMapper: RowWrapper => Row = row => {
+      val point = vectorMaker(row).toArray
+      val (cluster, distances) = DistanceFunctions.closestCentroidWithDistances(point, broadcastCentroids.value.centers)
+      Row.fromSeq(Seq(cluster) ++ distances)
+    }
+
+    val newColumns = Column("cluster", DataTypes.int32) +: sparkModel.clusterCenters.indices.map(i => Column("distance" + i.toString, DataTypes.float64))
+    frame.addColumns(predictMapper, newColumns)
+  }
+
   /**
    * Saves this model to a file
    * @param sc active SparkContext
@@ -232,6 +368,25 @@ case class KMeansModel private[kmeans] (columns: Seq[String],
   }
 }
 
+/**
+ * Centroids as scored against on the executors
+ * @param centers the cluster centers
+ * @param squaredNorms squared norm of each cluster center
+ */
+private[kmeans] case class KMeansCentroids(centers: Array[Array[Double]], squaredNorms: Array[Double]) extends Serializable {
+
+  /**
+   * Single precision copy of the centers, for scoring with precision "f32".  Made from the broadcast value where it is
+   * first used, so it is not serialized with the broadcast.
+   */
+  @transient lazy val floatCenters: Array[Array[Float]] = centers.map(_.map(_.toFloat))
+
+  /**
+   * Squared norm of each single precision center
+   */
+  @transient lazy val floatSquaredNorms: Array[Float] = floatCenters.map(DistanceFunctions.squaredNorm)
+}
+
 /**
  * TK Metadata that will be stored as part of the model
  * @param columns The names of the columns trained on
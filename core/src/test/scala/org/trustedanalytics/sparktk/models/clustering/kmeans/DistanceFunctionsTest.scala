@@ -0,0 +1,160 @@
+package org.trustedanalytics.sparktk.models.clustering.kmeans
+
+import org.scalatest.WordSpec
+import DistanceFunctions._
+
+class DistanceFunctionsTest extends WordSpec {
+
+  val centroids = Array(Array(1.5, 0.0), Array(6.75, 2.0), Array(0.0, -1.0))
+  val centroidSquaredNorms = centroids.map(squaredNorm)
+
+  "DistanceFunctions.squaredDistance" should {
+
+    "sum the squared differences when the length is a multiple of the unrolling" in {
+      assert(squaredDistance(Array(1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0), Array.fill(8)(0.0)) === 204.0)
+    }
+
+    "include the trailing elements past the unrolling" in {
+      assert(squaredDistance(Array(1.0, 2.0, 3.0, 4.0, 5.0, 6.0), Array(0.0, 0.0, 0.0, 0.0, 1.0, 8.0)) === 50.0)
+      assert(squaredDistance(Array(3.0), Array(1.0)) === 4.0)
+    }
+  }
+
+  "DistanceFunctions.dot" should {
+
+    "multiply and sum across and past the unrolling" in {
+      assert(dot(Array(1.0, 2.0, 3.0, 4.0, 5.0), Array(2.0, 2.0, 2.0, 2.0, -1.0)) === 15.0)
+      assert(squaredNorm(Array(3.0, 4.0)) === 25.0)
+    }
+  }
+
+  "DistanceFunctions.boundedSquaredDistance" should {
+
+    val a = Array.tabulate(40)(_.toDouble)
+    val b = Array.fill(40)(0.0)
+
+    "compute the full distance when it stays below the bound" in {
+      assert(boundedSquaredDistance(a, b, Double.PositiveInfinity) === squaredDistance(a, b))
+      assert(boundedSquaredDistance(a, b, 20541.0) === 20540.0)
+    }
+
+    "stop early once the partial sum reaches the bound" in {
+      // the first 16 dimensions alone sum to 1240
+      assert(boundedSquaredDistance(a, b, 100.0) === 1240.0)
+    }
+  }
+
+  "DistanceFunctions.squaredDistances" should {
+
+    "compute the squared distance to every centroid" in {
+      assert(squaredDistances(Array(2.0, 1.0), centroids, centroidSquaredNorms) === Array(1.25, 23.5625, 8.0))
+    }
+
+    "stay accurate for points far from the origin and close to a centroid" in {
+      val farCentroids = Array(Array(1e8, 1e8), Array(0.0, 0.0))
+      val distances = squaredDistances(Array(1e8 + 0.5, 1e8), farCentroids, farCentroids.map(squaredNorm))
+      assert(distances(0) === 0.25)
+    }
+
+    "compute directly the distances below 1e-3 of the squared norms" in {
+      // the distance is about 1.6e-5 of the squared norms; the norm expansion gives 366.2399999983609 for it
+      val point = Array(-2193.8, 2084.6, 1582.6)
+      val nearCentroids = Array(Array(-2190.6, 2094.6, 1598.6))
+      val distances = squaredDistances(point, nearCentroids, nearCentroids.map(squaredNorm))
+      assert(squaredDistance(point, nearCentroids(0)) === 366.2400000000017)
+      assert(distances(0) === 366.2400000000017)
+    }
+
+    "return zero for a point sitting on a centroid" in {
+      assert(squaredDistances(Array(0.0, -1.0), centroids, centroidSquaredNorms)(2) === 0.0)
+    }
+  }
+
+  "DistanceFunctions.closestCentroid" should {
+
+    "find the nearest centroid and its squared distance" in {
+      assert(closestCentroid(Array(6.0, 1.0), centroids, centroidSquaredNorms) === (1, 1.5625))
+    }
+
+    "find the nearest centroid among high dimensional centroids" in {
+      val point = Array.fill(50)(1.0)
+      val highDimensionalCentroids = Array(Array.fill(50)(3.0), Array.fill(50)(0.5), Array.fill(50)(-1.0))
+      assert(closestCentroid(point, highDimensionalCentroids, highDimensionalCentroids.map(squaredNorm)) === (1, 12.5))
+    }
+
+    "prefer the first centroid on ties" in {
+      assert(closestCentroid(Array(1.0), Array(Array(0.0), Array(2.0)), Array(0.0, 4.0)) === (0, 1.0))
+    }
+  }
+
+  "DistanceFunctions.closestCentroidWithDistances" should {
+
+    "find the nearest centroid and the squared distance to every centroid" in {
+      val (cluster, distances) = closestCentroidWithDistances(Array(2.0, 1.0), centroids)
+      assert(cluster === 0)
+      assert(distances === Array(1.25, 23.5625, 8.0))
+    }
+
+    "agree with closestCentroid among high dimensional centroids" in {
+      val point = Array.tabulate(50)(d => d * 1.1)
+      val highDimensionalCentroids = Array(Array.fill(50)(20.0), Array.tabulate(50)(d => d * 1.1 + 0.3), Array.fill(50)(0.0))
+      val (cluster, distances) = closestCentroidWithDistances(point, highDimensionalCentroids)
+      val (expectedCluster, expectedDistance) = closestCentroid(point, highDimensionalCentroids, highDimensionalCentroids.map(squaredNorm))
+      assert(cluster === expectedCluster)
+      assert(distances(cluster) === expectedDistance)
+    }
+
+    "prefer the first centroid on ties" in {
+      assert(closestCentroidWithDistances(Array(0.3), Array(Array(0.0), Array(0.6)))._1 === 0)
+    }
+  }
+
+  "DistanceFunctions.closestCentroids" should {
+
+    "give each point in a block the same result as closestCentroid" in {
+      val random = new scala.util.Random(7)
+      val blockCentroids = Array.fill(10)(Array.fill(20)(random.nextGaussian()))
+      val blockNorms = blockCentroids.map(squaredNorm)
+      val points = Array.fill(PointBlockSize + 3)(Array.fill(20)(random.nextGaussian()))
+
+      val (clusters, distances) = closestCentroids(points, blockCentroids, blockNorms)
+      for (p <- points.indices) {
+        assert((clusters(p), distances(p)) === closestCentroid(points(p), blockCentroids, blockNorms))
+      }
+    }
+  }
+
+  "DistanceFunctions single precision kernels" should {
+
+    "compute the squared distance across and past the unrolling" in {
+      assert(squaredDistance(Array(1.0f, 2.0f, 3.0f, 4.0f, 5.0f), Array(0.0f, 0.0f, 0.0f, 0.0f, 1.0f)) === 46.0f)
+    }
+
+    "stop the bounded distance early once the partial sum reaches the bound" in {
+      val a = Array.fill(40)(1.0f)
+      val b = Array.fill(40)(0.0f)
+      assert(boundedSquaredDistance(a, b, 100.0f) === 40.0f)
+      assert(boundedSquaredDistance(a, b, 10.0f) === 16.0f)
+    }
+
+    "find the same nearest centroid as the double precision kernel" in {
+      val floatCentroids = centroids.map(_.map(_.toFloat))
+      val floatNorms = floatCentroids.map(squaredNorm)
+      assert(closestCentroid(Array(6.0f, 1.0f), floatCentroids, floatNorms) === (1, 1.5625f))
+      val lineCentroids = Array(Array(0.0f), Array(2.0f))
+      assert(closestCentroid(Array(1.0f), lineCentroids, lineCentroids.map(squaredNorm)) === (0, 1.0f))
+    }
+
+    "find the nearest centroid among high dimensional centroids" in {
+      val point = Array.tabulate(50)(d => d.toFloat)
+      val farCentroids = Array(Array.fill(50)(100.0f), Array.tabulate(50)(d => d + 0.5f), Array.fill(50)(0.0f))
+      assert(closestCentroid(point, farCentroids, farCentroids.map(squaredNorm)) === (1, 12.5f))
+    }
+
+    "convert a point into a reused buffer" in {
+      val buffer = new Array[Float](2)
+      assert(toFloats(Array(1.5, -2.25), buffer) eq buffer)
+      assert(buffer === Array(1.5f, -2.25f))
+    }
+  }
+}
@@ -1,8 +1,12 @@
 package org.trustedanalytics.sparktk.models.clustering.kmeans
 
+import java.nio.{ ByteBuffer, ByteOrder }
+
+import org.apache.spark.mllib.clustering.{ KMeansModel => SparkKMeansModel }
+import org.apache.spark.mllib.linalg.Vectors
 import org.apache.spark.mllib.org.trustedanalytics.sparktk.MllibAliases
 import org.scalatest.Matchers
-import org.trustedanalytics.sparktk.frame.{ DataTypes, Column, FrameSchema }
+import org.trustedanalytics.sparktk.frame.{ DataTypes, Column, Frame, FrameSchema }
 import org.trustedanalytics.sparktk.frame.internal.RowWrapper
 import org.trustedanalytics.sparktk.testutils.TestingSparkContextWordSpec
 
@@ -45,4 +49,119 @@ class KMeansModelTest extends TestingSparkContextWordSpec with Matchers {
     }
   }
 
-}
\ No newline at end of file
+  "KMeansModel centroidsAsBytes" should {
+
+    "pack the centroids row-major as little-endian doubles" in {
+      val sparkModel = new SparkKMeansModel(Array(Vectors.dense(1.0, 2.0), Vectors.dense(3.5, -4.25)))
+      val model = KMeansModel(List("d1", "d2"), 2, None, 20, 1e-4, "k-means||", None, sparkModel)
+
+      val buffer = ByteBuffer.wrap(model.centroidsAsBytes).order(ByteOrder.LITTLE_ENDIAN)
+      val values = Array.fill(buffer.remaining() / 8)(buffer.getDouble)
+      assert(values === Array(1.0, 2.0, 3.5, -4.25))
+    }
+  }
+
+  "KMeansModel columnsAsJson and scalingsAsJson" should {
+
+    "encode the columns and scalings as JSON" in {
+      val sparkModel = new SparkKMeansModel(Array(Vectors.dense(1.0, 2.0)))
+      val model = KMeansModel(List("d1", "d2"), 1, Some(List(0.5, 2.0)), 20, 1e-4, "k-means||", None, sparkModel)
+
+      assert(model.columnsAsJson === """["d1","d2"]""")
+      assert(model.scalingsAsJson === "[0.5,2.0]")
+    }
+
+    "encode missing scalings as JSON null" in {
+      val sparkModel = new SparkKMeansModel(Array(Vectors.dense(1.0, 2.0)))
+      val model = KMeansModel(List("d1", "d2"), 1, None, 20, 1e-4, "k-means||", None, sparkModel)
+
+      assert(model.scalingsAsJson === "null")
+    }
+  }
+
+  "KMeansModel precision" should {
+
+    val schema = FrameSchema(Vector(Column("data", DataTypes.float64)))
+    val sparkModel = new SparkKMeansModel(Array(Vectors.dense(1.5), Vectors.dense(6.75), Vectors.dense(0.0)))
+    val model = KMeansModel(List("data"), 3, None, 20, 1e-4, "k-means||", None, sparkModel)
+
+    "predict clusters in single precision" in {
+      val frame = new Frame(sparkContext.parallelize(List(Row(2.0), Row(7.0), Row(0.0))), schema)
+
+      model.predict(frame, None, "f32")
+
+      assert(frame.rdd.collect().map(_.getInt(1)) === Array(0, 1, 2))
+    }
+
+    "add distance columns in single precision" in {
+      val frame = new Frame(sparkContext.parallelize(List(Row(2.0), Row(7.0), Row(0.0))), schema)
+
+      model.addDistanceColumns(frame, None, "f32")
+
+      assert(frame.schema.columnNames === List("data", "distance0", "distance1", "distance2"))
+      val results = frame.rdd.collect().map(_.toSeq.toList)
+      assert(results === Array(List(2.0, 0.25, 22.5625, 4.0),
+        List(7.0, 30.25, 0.0625, 49.0),
+        List(0.0, 2.25, 45.5625, 0.0)))
+    }
+
+    "reject an unknown precision" in {
+      val frame = new Frame(sparkContext.parallelize(List(Row(2.0))), schema)
+
+      intercept[IllegalArgumentException] {
+        model.predict(frame, None, "f16")
+      }
+      intercept[IllegalArgumentException] {
+        model.addDistanceColumns(frame, None, "f16")
+      }
+    }
+  }
+
+  "KMeansModel predictWithDistances" should {
+
+    "add the cluster and distance columns in one pass" in {
+      val schema = FrameSchema(Vector(Column("data", DataTypes.float64)))
+      val rows = sparkContext.parallelize(List(Row(2.0), Row(7.0), Row(0.0)))
+      val frame = new Frame(rows, schema)
+      val sparkModel = new SparkKMeansModel(Array(Vectors.dense(1.5), Vectors.dense(6.75), Vectors.dense(0.0)))
+      val model = KMeansModel(List("data"), 3, None, 20, 1e-4, "k-means||", None, sparkModel)
+
+      model.predictWithDistances(frame)
+
+      assert(frame.schema.columnNames === List("data", "cluster", "distance0", "distance1", "distance2"))
+      val results = frame.rdd.collect().map(_.toSeq.toList)
+      assert(results === Array(List(2.0, 0, 0.25, 22.5625, 4.0),
+        List(7.0, 1, 30.25, 0.0625, 49.0),
+        List(0.0, 2, 2.25, 45.5625, 0.0)))
+    }
+
+    "assign the same cluster as predict for an observation equidistant from two centroids" in {
+      // 0.3 is exactly as far from 0.0 as from 0.6, but the norm expansion makes the second distance come out smaller
+      val schema = FrameSchema(Vector(Column("data", DataTypes.float64)))
+      val sparkModel = new SparkKMeansModel(Array(Vectors.dense(0.0), Vectors.dense(0.6)))
+      val model = KMeansModel(List("data"), 2, None, 20, 1e-4, "k-means||", None, sparkModel)
+      val predictFrame = new Frame(sparkContext.parallelize(List(Row(0.3))), schema)
+      val distancesFrame = new Frame(sparkContext.parallelize(List(Row(0.3))), schema)
+
+      model.predict(predictFrame)
+      model.predictWithDistances(distancesFrame)
+
+      assert(predictFrame.rdd.collect().head.getInt(1) === 0)
+      assert(distancesFrame.rdd.collect().head.getInt(1) === 0)
+    }
+  }
+
+  "KMeansModel computeClusterSizes" should {
+
+    "count the observations in each cluster, in cluster order, including empty clusters" in {
+      val schema = FrameSchema(Vector(Column("data", DataTypes.float64)))
+      val data = List(2.0, 1.0, 7.0, 1.0, 9.0, 2.0, 0.0, 6.0, 5.0).map(Row(_))
+      val frame = new Frame(sparkContext.parallelize(data, 3), schema)
+      val sparkModel = new SparkKMeansModel(Array(Vectors.dense(1.5), Vectors.dense(6.75), Vectors.dense(0.0), Vectors.dense(100.0)))
+      val model = KMeansModel(List("data"), 4, None, 20, 1e-4, "k-means||", None, sparkModel)
+
+      assert(model.computeClusterSizes(frame) === Array(4L, 4L, 1L, 0L))
+    }
+  }
+
+}
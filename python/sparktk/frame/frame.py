@@ -42,8 +42,13 @@ class Frame(object):
                 else:
                     # Schema is not a list or None
                     raise TypeError("Invalid schema type: %s.  Expected a list of tuples (str, type) with the column name and data type." % type(schema))
+                if schema and validate_schema:
+                    # The data is already in memory, so validate it here before the single transfer to spark, rather
+                    # than running a spark job over an rdd which would later be computed again
+                    source, bad_value_count = self._validate_list_schema(source, schema)
+                    logger.debug("%s values were unable to be parsed to the schema's data type." % bad_value_count)
                 source = tc.sc.parallelize(source)
-            if schema and validate_schema:
+            elif schema and validate_schema:
                 # Validate schema by going through the data and checking the data type and attempting to parse it
                 validate_schema_result = self.validate_pyrdd_schema(source, schema)
                 source = validate_schema_result.validated_rdd
@@ -129,21 +134,11 @@ class Frame(object):
 
     def validate_pyrdd_schema(self, pyrdd, schema):
         if isinstance(pyrdd, RDD):
-            schema_length = len(schema)
             num_bad_values = self._tc.sc.accumulator(0)
 
             def validate_schema(row, accumulator):
-                data = []
-                if len(row) != schema_length:
-                    raise ValueError("Length of the row (%s) does not match the schema length (%s)." % (len(row), len(schema)))
-                for index, column in enumerate(schema):
-                    data_type = column[1]
-                    try:
-                        if row[index] is not None:
-                            data.append(dtypes.dtypes.cast(row[index], data_type))
-                    except:
-                        data.append(None)
-                        accumulator += 1
+                data, bad_value_count = _cast_row_to_schema(row, schema)
+                accumulator += bad_value_count
                 return data
 
             validated_rdd = pyrdd.map(lambda row: validate_schema(row, num_bad_values))
@@ -155,6 +150,23 @@ class Frame(object):
         else:
             raise TypeError("Unable to validate schema, because the pyrdd provided is not an RDD.")
 
+    @staticmethod
+    def _validate_list_schema(data, schema):
+        """
+        Validates a list of rows against the schema without going through spark
+
+        :param data: list of rows
+        :param schema: schema to cast the row values to
+        :return: tuple of the validated rows and the number of values which were unable to be parsed
+        """
+        validated_data = []
+        bad_value_count = 0
+        for row in data:
+            validated_row, row_bad_value_count = _cast_row_to_schema(row, schema)
+            validated_data.append(validated_row)
+            bad_value_count += row_bad_value_count
+        return validated_data, bad_value_count
+
     @staticmethod
     def create_scala_frame(sc, scala_rdd, scala_schema):
         """call constructor in JVM"""
@@ -326,6 +338,29 @@ class Frame(object):
     from sparktk.frame.ops.unflatten_columns import unflatten_columns
 
 
+def _cast_row_to_schema(row, schema):
+    """
+    Casts the values in the row to the data types in the schema.  Values which cannot be parsed are replaced with None.
+
+    :param row: list of values
+    :param schema: list of tuples of column names and data types
+    :return: tuple of the casted row and the number of values which were unable to be parsed
+    """
+    if len(row) != len(schema):
+        raise ValueError("Length of the row (%s) does not match the schema length (%s)." % (len(row), len(schema)))
+    data = []
+    bad_value_count = 0
+    for index, column in enumerate(schema):
+        data_type = column[1]
+        try:
+            if row[index] is not None:
+                data.append(dtypes.dtypes.cast(row[index], data_type))
+        except:
+            data.append(None)
+            bad_value_count += 1
+    return data, bad_value_count
+
+
 class SchemaValidationReturn(PropertiesObject):
     """
     Return value from schema validation that includes the rdd of validated values and the number of bad values
@@ -8,6 +8,7 @@ class JConvert(object):
         self.jutils = jutils
         self.sc = jutils.sc
         self.scala = self.sc._jvm.org.trustedanalytics.sparktk.jvm.JConvert
+        self._scala_none = None
 
     def list_to_double_list(self, python_list):
         return [float(item) for item in python_list]
@@ -47,8 +48,22 @@ class JConvert(object):
         return self.scala.scalaMapToPython(m)
 
     def to_scala_option(self, item):
+        if item is None:
+            return self.scala_none
         return self.scala.toOption(item)
 
+    def to_scala_option_long(self, item):
+        if item is None:
+            return self.scala_none
+        return self.scala.toOptionLong(item)
+
+    @property
+    def scala_none(self):
+        """scala None, fetched from the JVM once and then reused"""
+        if self._scala_none is None:
+            self._scala_none = self.scala.toOption(None)
+        return self._scala_none
+
     def to_scala_option_list_double(self, python_list):
         if isinstance(python_list, list):
             python_list = self.list_to_double_list(python_list)
@@ -1,6 +1,10 @@
 from sparktk.loggers import log_load; log_load(__name__); del log_load
 
 from sparktk.propobj import PropertiesObject
+from multiprocessing.pool import ThreadPool
+from threading import Lock
+import json
+import numpy as np
 
 
 def train(frame, columns, k=2, scalings=None, max_iter=20, epsilon=1e-4, seed=None, init_mode="k-means||"):
@@ -30,10 +34,21 @@ def train(frame, columns, k=2, scalings=None, max_iter=20, epsilon=1e-4, seed=No
     else:
         scala_scalings = tc.jutils.convert.to_scala_option(None)
 
-    seed = seed if seed is None else long(seed)
-    scala_seed = tc.jutils.convert.to_scala_option(seed)
+    scala_seed = tc.jutils.convert.to_scala_option_long(seed if seed is None else int(seed))
     scala_model = _scala_obj.train(frame._scala, scala_columns, k, scala_scalings, max_iter, epsilon, init_mode, scala_seed)
-    return KMeansModel(tc, scala_model)
+    return KMeansModel._from_trusted_scala(tc, scala_model)
+
+
+def _closest_centroids(points, centroids):
+    """
+    Index of the nearest centroid for each row of points
+
+    :param points: numpy array with one observation per row
+    :param centroids: numpy array with one centroid per row
+    :return: numpy array of centroid indices (the first centroid wins ties)
+    """
+    distances = ((points[:, np.newaxis, :] - centroids[np.newaxis, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
 
 
 def get_scala_obj(tc):
@@ -41,6 +56,19 @@ def get_scala_obj(tc):
     return tc.sc._jvm.org.trustedanalytics.sparktk.models.clustering.kmeans.KMeansModel
 
 
+_save_pool = None
+_save_pool_lock = Lock()
+
+
+def _get_save_pool():
+    """Gets the thread pool shared by save_async calls, creating it on first use"""
+    global _save_pool
+    with _save_pool_lock:
+        if _save_pool is None:
+            _save_pool = ThreadPool(2)
+    return _save_pool
+
+
 class KMeansModel(PropertiesObject):
     """
     A trained KMeans model
@@ -67,7 +95,7 @@ class KMeansModel(PropertiesObject):
     >>> sizes = model.compute_sizes(frame)
 
     >>> sizes
-    [4, 1, 4]
+    [4, 4, 1]
 
     >>> wsse = model.compute_wsse(frame)
 
@@ -89,6 +117,14 @@ class KMeansModel(PropertiesObject):
     [7]   6.0  op          1
     [8]   5.0  qr          1
 
+    >>> model.predict_local([[2.0], [7.0], [0.0]])
+    [0, 1, 2]
+
+    >>> model.predict_local([[2.0, 7.0], [0.0, 1.0]])
+    Traceback (most recent call last):
+    ...
+    ValueError: Expected observations of 1 value(s) each, one per model column, but got an array of shape (2, 2)
+
     >>> model.add_distance_columns(frame)
 
     >>> frame.inspect()
@@ -114,6 +150,10 @@ class KMeansModel(PropertiesObject):
 
     >>> model.save("sandbox/kmeans1")
 
+    >>> pending_save = model.save_async("sandbox/kmeans2")
+
+    >>> pending_save.get()
+
     >>> restored = tc.load("sandbox/kmeans1")
 
     >>> restored.centroids == centroids
@@ -127,40 +167,66 @@ class KMeansModel(PropertiesObject):
     """
 
     def __init__(self, tc, scala_model):
-        self._tc = tc
         tc.jutils.validate_is_jvm_instance_of(scala_model, get_scala_obj(tc))
+        self._init(tc, scala_model)
+
+    def _init(self, tc, scala_model):
+        self._tc = tc
         self._scala = scala_model
+        self._cache = {}
+
+    @staticmethod
+    def _from_trusted_scala(tc, scala_model):
+        """
+        Creates the model without the JVM type check in __init__, for scala models which are known to be KMeansModels
+        (returned by train, or dispatched here by tc.load based on their scala class)
+        """
+        model = KMeansModel.__new__(KMeansModel)
+        model._init(tc, scala_model)
+        return model
 
     @staticmethod
     def load(tc, scala_model):
-        return KMeansModel(tc, scala_model)
+        return KMeansModel._from_trusted_scala(tc, scala_model)
+
+    def _get_cached(self, name, get_value):
+        """returns the value for name, only going to the JVM on first access (a trained model does not change)"""
+        if name not in self._cache:
+            self._cache[name] = get_value()
+        return self._cache[name]
 
     @property
     def columns(self):
-        return list(self._tc.jutils.convert.from_scala_seq(self._scala.columns()))
+        return list(self._get_cached('columns', lambda: json.loads(self._scala.columnsAsJson())))
 
     @property
     def scalings(self):
-        s = self._tc.jutils.convert.from_scala_option(self._scala.scalings())
-        if s:
-            return list(self._tc.jutils.convert.from_scala_seq(s))
-        return None
+        s = self._get_cached('scalings', lambda: json.loads(self._scala.scalingsAsJson()))
+        return list(s) if s is not None else None
 
     @property
     def k(self):
-        return self._scala.k()
+        return self._get_cached('k', lambda: self._scala.k())
 
     @property
     def max_iterations(self):
-        return self._scala.maxIterations()
+        return self._get_cached('max_iterations', lambda: self._scala.maxIterations())
 
     @property
     def initialization_mode(self):
-        return self._scala.initializationMode()
+        return self._get_cached('initialization_mode', lambda: self._scala.initializationMode())
 
     @property
     def centroids(self):
-        return [list(item) for item in list(self._scala.centroidsAsArrays())]
+        return self._get_centroids_array().tolist()
+
+    def _get_centroids_array(self):
+        """centroids as a numpy array, one row per centroid"""
+        def get_centroids_array():
+            # centroids come over as one packed byte array of little-endian doubles
+            packed = np.frombuffer(self._scala.centroidsAsBytes(), dtype='<f8')
+            return packed.reshape(-1, len(self.columns))
+        return self._get_cached('centroids', get_centroids_array)
 
     def compute_sizes(self, frame, columns=None):
         c = self.__columns_to_option(columns)
@@ -170,13 +236,41 @@ class KMeansModel(PropertiesObject):
         c = self.__columns_to_option(columns)
         return self._scala.computeWsse(frame._scala, c)
 
-    def predict(self, frame, columns=None):
+    def predict(self, frame, columns=None, precision="f64"):
+        """adds a 'cluster' column; precision is "f64" (default) or "f32" to score against single precision centroids"""
+        c = self.__columns_to_option(columns)
+        self._scala.predict(frame._scala, c, precision)
+
+    def predict_local(self, observations):
+        """
+        Predicts the cluster of each observation in a local list with numpy on the driver, rather than running a spark
+        job.  Meant for small amounts of data, like scoring a handful of points in a notebook.
+
+        :param observations: list of observations, each a list of values for the columns the model was trained on.
+         For a model trained on a single column, a flat list of values is also accepted.
+        :return: list of the predicted cluster for each observation
+        """
+        width = len(self.columns)
+        points = np.asarray(observations, dtype=np.float64)
+        if points.ndim == 1 and width == 1:
+            points = points.reshape(-1, 1)
+        if points.ndim != 2 or points.shape[1] != width:
+            raise ValueError("Expected observations of %d value(s) each, one per model column, but got an array of shape %s"
+                             % (width, points.shape))
+        scalings = self.scalings
+        if scalings is not None:
+            points = points * np.asarray(scalings, dtype=np.float64)
+        return _closest_centroids(points, self._get_centroids_array()).tolist()
+
+    def add_distance_columns(self, frame, columns=None, precision="f64"):
+        """adds a 'distance<n>' column per centroid; precision is "f64" (default) or "f32" for single precision distances"""
         c = self.__columns_to_option(columns)
-        self._scala.predict(frame._scala, c)
+        self._scala.addDistanceColumns(frame._scala, c, precision)
 
-    def add_distance_columns(self, frame, columns=None):
+    def predict_with_distances(self, frame, columns=None):
+        """adds the 'cluster' column and the distance columns in a single pass, same as predict then add_distance_columns"""
         c = self.__columns_to_option(columns)
-        self._scala.addDistanceColumns(frame._scala, c)
+        self._scala.predictWithDistances(frame._scala, c)
 
     def __columns_to_option(self, c):
         if c is not None:
@@ -186,4 +280,15 @@ class KMeansModel(PropertiesObject):
     def save(self, path):
         self._scala.save(self._tc._scala_sc, path)
 
+    def save_async(self, path):
+        """
+        Saves the model in a background thread, so the caller can carry on (for example, training the next model)
+        while the model is written out.  py4j and the SparkContext both allow calls from multiple threads.
+
+        :param path: save to path
+        :return: multiprocessing.pool.AsyncResult; call its get() to wait for the save to finish (and raise any error
+         from it), for instance before the program exits
+        """
+        return _get_save_pool().apply_async(self.save, (path,))
+
 del PropertiesObject
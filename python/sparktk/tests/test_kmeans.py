@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from sparktk.models.clustering.kmeans import KMeansModel
+
+
+def get_local_model(columns, scalings, centroids):
+    """KMeansModel with its properties already cached, so predict_local runs without a JVM"""
+    model = KMeansModel.__new__(KMeansModel)
+    model._init(None, None)
+    model._cache.update({'columns': columns,
+                         'scalings': scalings,
+                         'centroids': np.asarray(centroids, dtype=np.float64)})
+    return model
+
+
+class TestKMeansPredictLocal(unittest.TestCase):
+
+    def test_predict_local(self):
+        model = get_local_model(["x", "y"], None, [[0.0, 0.0], [10.0, 10.0]])
+        self.assertEqual([0, 1, 0], model.predict_local([[1.0, 2.0], [9.0, 8.0], [-1.0, 0.0]]))
+
+    def test_predict_local_applies_scalings(self):
+        model = get_local_model(["x", "y"], [0.5, 2.0], [[2.0, 2.0], [5.0, 0.0]])
+        # scaled, [4.0, 1.0] is [2.0, 2.0]; unscaled it would be nearer the second centroid
+        self.assertEqual([0, 1], model.predict_local([[4.0, 1.0], [10.0, 0.0]]))
+
+    def test_predict_local_flat_list_for_one_column(self):
+        model = get_local_model(["x"], None, [[0.0], [10.0]])
+        self.assertEqual([0, 1, 1], model.predict_local([1.0, 9.0, 6.0]))
+
+    def test_predict_local_rejects_wrong_width(self):
+        one_column_model = get_local_model(["x"], None, [[0.0], [10.0]])
+        with self.assertRaises(ValueError):
+            one_column_model.predict_local([[1.0, 2.0], [3.0, 4.0]])
+        two_column_model = get_local_model(["x", "y"], None, [[0.0, 0.0], [10.0, 10.0]])
+        with self.assertRaises(ValueError):
+            two_column_model.predict_local([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+        with self.assertRaises(ValueError):
+            two_column_model.predict_local([1.0, 2.0])
+
+
+if __name__ == '__main__':
+    unittest.main()